@@ -1,249 +1,461 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-import json
+import matplotlib.ticker as ticker
 import re
+import json
+import os
+import stat
+import time
+import hashlib
+import tempfile
 from collections import Counter
+from functools import lru_cache
+import orjson
+import pyarrow as pa
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Disable math text parsing globally yeah
 mpl.rcParams['text.usetex'] = False
 mpl.rcParams['mathtext.default'] = 'regular'
 
-# Load the JSON data from a URL
-@st.cache_data
-def load_json_from_url(url):
+# Function to get the shared HTTP session, so every fetch reuses the same
+# keep-alive connection pool, retrying transient CDN errors with backoff.
+# Cached as a resource: the script body reruns on every interaction, and a
+# module-level session would be rebuilt (and its connections dropped) each time.
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    ))
+    return session
+
+# Function to parse JSON bytes with orjson. orjson only reads UTF-8 without a
+# byte order mark, so anything it rejects (e.g. files saved with a BOM by
+# Windows editors, or UTF-16) is retried with the standard library, which
+# detects those encodings
+def parse_json(body):
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return json.loads(body)
+
+# Directory of the on-disk feed snapshots
+FEED_SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), 'prebid-im-streamlit')
+
+# How long (in seconds) a loaded feed, in memory or on disk, is used before
+# checking the server for a newer one
+FEED_MAX_AGE = 3600
+
+# Prefix of a data key derived from the feed contents, used when the server
+# sends no ETag to identify the version of the feed
+CONTENT_KEY_PREFIX = 'sha256:'
+
+# Function to check that the snapshot directory can be trusted. It lives in the
+# shared temp directory, so it must be a real directory owned by this user that
+# no one else can write to; otherwise another local user could plant a feed.
+def feed_snapshot_dir_is_safe():
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        st.error(f"Error fetching data from URL: {e}")
+        dir_stat = os.lstat(FEED_SNAPSHOT_DIR)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(dir_stat.st_mode) or dir_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return False
+    return not hasattr(os, 'getuid') or dir_stat.st_uid == os.getuid()
+
+# Function to get the snapshot file path of a feed URL
+def feed_snapshot_path(url):
+    return os.path.join(FEED_SNAPSHOT_DIR, hashlib.sha256(url.encode()).hexdigest())
+
+# Function to read the snapshot of a feed from disk; returns the raw body, its
+# data key and whether it is still fresh, or None when there is no snapshot
+def read_feed_snapshot(url):
+    if not feed_snapshot_dir_is_safe():
         return None
-    except json.JSONDecodeError:
-        st.error("The data fetched is not a valid JSON.")
+    path = feed_snapshot_path(url)
+    try:
+        fresh = time.time() - os.path.getmtime(path) <= FEED_MAX_AGE
+        with open(path, 'rb') as f:
+            # The data key is stored on the first line, followed by the body
+            data_key = f.readline().rstrip(b'\n').decode()
+            return f.read(), data_key, fresh
+    except (OSError, UnicodeDecodeError):
+        # A missing, unreadable or corrupt snapshot is treated as no snapshot
         return None
-    return data
 
-# Load the JSON data from the uploaded file
-def load_json(file):
+# Function to mark the snapshot of a feed as fresh again, after the server
+# confirmed it is unchanged
+def renew_feed_snapshot(url):
+    try:
+        os.utime(feed_snapshot_path(url))
+    except OSError:
+        pass
+
+# Function to delete the snapshot of a feed, e.g. when its body is corrupt
+def remove_feed_snapshot(url):
+    try:
+        os.remove(feed_snapshot_path(url))
+    except OSError:
+        pass
+
+# Function to write a snapshot of a feed to disk, so an app restart does not
+# download it again; best effort, a failed write only means no snapshot
+def write_feed_snapshot(url, body, data_key):
+    temp_path = None
+    try:
+        os.makedirs(FEED_SNAPSHOT_DIR, mode=0o700, exist_ok=True)
+        if not feed_snapshot_dir_is_safe():
+            return
+        # Write to a temporary file and move it into place, so readers never
+        # see a partial snapshot
+        with tempfile.NamedTemporaryFile(dir=FEED_SNAPSHOT_DIR, delete=False) as f:
+            temp_path = f.name
+            f.write(data_key.encode() + b'\n')
+            f.write(body)
+        os.replace(temp_path, feed_snapshot_path(url))
+    except OSError:
+        # Do not leave the partial temporary file behind
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+# Load the JSON data from a URL, along with a key identifying this version
+# of the feed (its ETag, or a hash of the body when the server sends none, so
+# the caches keyed on it never outlive the data). Cached as a
+# resource: the parsed list is shared read-only instead of being deep-copied
+# out of the cache on every rerun. A fresh on-disk snapshot is used instead
+# of the network, so restarts skip the download. Both expire after
+# FEED_MAX_AGE, so a long-running app picks up new monitor results; an expired
+# snapshot is revalidated with its ETag and only downloaded again if changed.
+@st.cache_resource(ttl=FEED_MAX_AGE)
+def load_json_from_url(url):
+    return fetch_json_from_url(url)
+
+# Function to fetch and parse the JSON data behind `load_json_from_url`; with
+# `use_snapshot` false, the on-disk snapshot is ignored and the feed downloaded
+def fetch_json_from_url(url, use_snapshot=True):
+    snapshot = read_feed_snapshot(url) if use_snapshot else None
+    snapshot_body, snapshot_key, fresh = snapshot or (None, None, False)
+    downloaded = False
+    refresh_error = None
+    if fresh:
+        body, data_key = snapshot_body, snapshot_key
+    else:
+        # Revalidate an expired snapshot, unless the server sent no ETag for it
+        headers = {}
+        if snapshot_key is not None and not snapshot_key.startswith(CONTENT_KEY_PREFIX):
+            headers['If-None-Match'] = snapshot_key
+        try:
+            with get_session().get(url, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code == 304:
+                    # Unchanged since the snapshot; reuse it without a download
+                    body, data_key = snapshot_body, snapshot_key
+                    renew_feed_snapshot(url)
+                else:
+                    response.raise_for_status()
+                    # Read the (decompressed) body in one go instead of joining
+                    # requests' small chunks, so the payload is held in memory once
+                    body = response.raw.read(decode_content=True)
+                    data_key = response.headers.get('ETag') or CONTENT_KEY_PREFIX + hashlib.sha256(body).hexdigest()
+                    downloaded = True
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            if snapshot_body is None:
+                st.error(f"Error fetching data from URL: {e}")
+                return None, None
+            # Keep serving the expired snapshot rather than no data at all
+            refresh_error = e
+            body, data_key = snapshot_body, snapshot_key
+
+    try:
+        data = parse_json(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        if not downloaded:
+            # The snapshot is corrupt: drop it and download the feed instead
+            remove_feed_snapshot(url)
+            return fetch_json_from_url(url, use_snapshot=False)
+        st.error("The data fetched is not a valid JSON.")
+        return None, None
+
+    if refresh_error is not None:
+        st.warning(f"Could not refresh data from URL, showing the last downloaded data: {refresh_error}")
+    if downloaded:
+        write_feed_snapshot(url, body, data_key)
+    return data, data_key
+
+# Load the JSON data from the uploaded file; cached on the upload's `file_id`
+# so reruns neither re-parse nor hash the file contents
+@st.cache_resource(max_entries=4)
+def load_json(file_id, _file):
     try:
         # Load JSON data into a Python list
-        data = json.load(file)
-    except json.JSONDecodeError:
+        data = parse_json(_file.getvalue())
+    except (json.JSONDecodeError, UnicodeDecodeError):
         st.error("The uploaded file is not a valid JSON.")
         return None
     return data
 
-# Function to categorize versions into broader buckets
-def categorize_version(version):
-    # Remove leading 'v' if present
-    if version.startswith('v'):
-        version = version[1:]
+# Major part of a version: digits after an optional leading 'v', ending at the
+# first '.' or '-' separator or at the end of the string
+VERSION_MAJOR = re.compile(r'v?(\d+)(?:[.-]|$)')
 
-    # Split the version into major and minor parts
-    version_parts = re.split(r'\.|-', version)
+# Version buckets in display order
+VERSION_BUCKETS = ['0.x-2.x', '3.x-5.x', '6.x-7.x', '8.x', '9.x', 'Other']
 
-    try:
-        major = int(version_parts[0])
-    except ValueError:
-        return 'Other'
+# Version bucket of each major version; majors past the end are 'Other'
+MAJOR_VERSION_BUCKETS = ('0.x-2.x',) * 3 + ('3.x-5.x',) * 3 + ('6.x-7.x',) * 2 + ('8.x', '9.x')
 
-    # Group versions into broader buckets
-    if major in [0, 1, 2]:
-        return '0.x-2.x'
-    elif major in [3, 4, 5]:
-        return '3.x-5.x'
-    elif major in [6, 7]:
-        return '6.x-7.x'
-    elif major == 8:
-        return '8.x'
-    elif major == 9:
-        return '9.x'
-    else:
-        return 'Other'
-
-# Classify modules by type
-def classify_module(module_name):
-    if 'BidAdapter' in module_name:
-        return 'Bid Adapter'
-    elif 'RtdProvider' in module_name or 'rtdModule' in module_name:
-        return 'RTD Module'
-    elif 'IdSystem' in module_name or 'userId' in module_name:
-        return 'ID System'
-    elif 'Analytics' in module_name or 'analyticsAdapter' in module_name:
-        return 'Analytics Adapter'
-    else:
+# Function to categorize versions into broader buckets
+# (cached: the same few version strings repeat across thousands of sites)
+@lru_cache(maxsize=None)
+def categorize_version(version):
+    # Match the major part without splitting the whole string
+    match = VERSION_MAJOR.match(version)
+    if match is None:
         return 'Other'
+    major = int(match.group(1))
 
-# Function to extract versions from an item
-def extract_versions(item):
-    versions = []
-    if 'version' in item:
-        versions.append(item['version'])
-    if 'prebidInstances' in item:
-        for instance in item['prebidInstances']:
-            if 'version' in instance:
-                versions.append(instance['version'])
-    return versions
-
-# Function to extract modules from an item
-def extract_modules(item):
-    modules = []
-    if 'modules' in item:
-        modules.extend(item['modules'])
-    if 'prebidInstances' in item:
-        for instance in item['prebidInstances']:
-            if 'modules' in instance:
-                modules.extend(instance['modules'])
-    return modules
-
-# Function to count total modules in an item
+    # Group versions into broader buckets
+    if major < len(MAJOR_VERSION_BUCKETS):
+        return MAJOR_VERSION_BUCKETS[major]
+    return 'Other'
+
+# Module categories in display order
+MODULE_CATEGORIES = ['Bid Adapter', 'RTD Module', 'ID System', 'Analytics Adapter', 'Other']
+
+# Substrings identifying each module category except 'Other', one capture group
+# per category. The anchored lookaheads are tried in order, so a name matching
+# several categories gets the first one, just like a chain of `in` checks.
+MODULE_CATEGORY_PATTERN = re.compile(
+    r'^(?:(?=.*(BidAdapter))'
+    r'|(?=.*(RtdProvider|rtdModule))'
+    r'|(?=.*(IdSystem|userId))'
+    r'|(?=.*(Analytics|analyticsAdapter)))',
+    re.DOTALL
+)
+
+# Classify a Series of module names by type in one vectorized pass
+def classify_modules(module_names):
+    matched = module_names.str.extract(MODULE_CATEGORY_PATTERN).notna()
+    matched.columns = MODULE_CATEGORIES[:-1]
+    return matched.idxmax(axis=1).where(matched.any(axis=1), 'Other')
+
+# Function to count total modules in an item, without building the combined list
 def count_modules(item):
-    modules = extract_modules(item)
-    return len(modules)
-
-# Function to count Prebid instances in an item
-def count_prebid_instances(item):
-    if 'prebidInstances' in item:
-        return len(item['prebidInstances'])
-    elif 'version' in item:
-        return 1
-    else:
-        return 0
-
-# Function to extract libraries from an item
-def extract_libraries(item):
-    libraries = []
-    if 'libraries' in item:
-        libraries.extend(item['libraries'])
-    return libraries
-
-# Function to extract global variable names from data
-def extract_global_var_names(data):
-    global_var_names = []
-    for item in data:
-        if 'prebidInstances' in item:
-            for instance in item['prebidInstances']:
-                if 'globalVarName' in instance:
-                    global_var_names.append(instance['globalVarName'])
-        else:
-            # If 'prebidInstances' is not present but 'globalVarName' is at top level
-            if 'globalVarName' in item:
-                global_var_names.append(item['globalVarName'])
-    return global_var_names
-
-# Function to extract and classify modules
-def extract_module_stats(data):
-    module_site_counter = {
-        'Bid Adapter': Counter(),
-        'RTD Module': Counter(),
-        'ID System': Counter(),
-        'Analytics Adapter': Counter(),
-        'Other': Counter()
-    }
-
-    module_instance_counter = {
-        'Bid Adapter': Counter(),
-        'RTD Module': Counter(),
-        'ID System': Counter(),
-        'Analytics Adapter': Counter(),
-        'Other': Counter()
-    }
-
-    total_prebid_instances = 0
-
-    for item in data:
-        prebid_instances = []
-
+    module_count = len(item.get('modules', ()))
+    for instance in item.get('prebidInstances', ()):
+        module_count += len(instance.get('modules', ()))
+    return module_count
+
+# Columns of the normalized per-instance frame
+INSTANCE_COLUMNS = ['site_index', 'version', 'modules', 'globalVarName']
+
+# Columns of the frame of top-level values counted besides the instances
+TOP_LEVEL_COLUMNS = ['site_index', 'version', 'globalVarName']
+
+# Arrow type of the per-instance module lists
+MODULE_LIST_DTYPE = pd.ArrowDtype(pa.list_(pa.string()))
+
+# Maximum number of modules for an entry to be included in the analysis
+MAX_MODULES = 300
+
+# Function to bucket a column of version strings, stored as a categorical (one
+# small int code per row); mapping the categorical only categorizes each
+# distinct version string once
+def bucket_versions(versions):
+    return pd.Categorical(versions.map(categorize_version, na_action='ignore'), categories=VERSION_BUCKETS)
+
+# Function to filter the data and normalize it into one row per Prebid instance
+# in a single pass; returns the number of kept sites, the per-instance frame, a
+# Counter of the libraries detected on those sites and the frame of top-level
+# values counted besides the instances. Cached across reruns on `data_key`, so
+# `_data` itself is never hashed and reruns never walk it again.
+@st.cache_resource(max_entries=4)
+def normalize_data(data_key, _data, max_modules=MAX_MODULES):
+    total_sites = 0
+    libraries = Counter()
+    nested_items = []
+    legacy_rows = []
+    top_level_rows = []
+    for item in _data:
+        # Filter out entries with more than `max_modules` modules
+        if count_modules(item) > max_modules:
+            continue
+
+        site_index = total_sites
+        total_sites += 1
+        libraries.update(item.get('libraries', ()))
         if 'prebidInstances' in item:
-            prebid_instances = item['prebidInstances']
+            nested_items.append({'site_index': site_index, 'prebidInstances': item['prebidInstances']})
+            # A top-level version next to the instances is counted as well
+            if 'version' in item:
+                top_level_rows.append((site_index, item['version'], None))
         elif 'version' in item:
-            prebid_instances = [item]
-
-        total_prebid_instances += len(prebid_instances)
-
-        modules_in_site = set()
-
-        for instance in prebid_instances:
-            modules = instance.get('modules', [])
-            unique_modules_in_instance = set(modules)
-            modules_in_site.update(unique_modules_in_instance)
-
-            # Count module occurrences per Prebid instance
-            for module in unique_modules_in_instance:
-                category = classify_module(module)
-                module_instance_counter[category][module] += 1
-
-        # Count modules per site
-        for module in modules_in_site:
-            category = classify_module(module)
-            module_site_counter[category][module] += 1
-
-    return module_site_counter, module_instance_counter, total_prebid_instances
+            # Older records describe a single Prebid instance at the top level;
+            # keep each as a tuple in INSTANCE_COLUMNS order rather than a dict
+            legacy_rows.append((site_index, item['version'], item.get('modules'), item.get('globalVarName')))
+        elif 'globalVarName' in item:
+            # A global name without any Prebid instance is counted as well
+            top_level_rows.append((site_index, None, item['globalVarName']))
+
+    frames = []
+    if nested_items:
+        frames.append(pd.json_normalize(nested_items, 'prebidInstances', meta=['site_index']))
+    if legacy_rows:
+        frames.append(pd.DataFrame(legacy_rows, columns=INSTANCE_COLUMNS))
+    if frames:
+        instances = pd.concat(frames, ignore_index=True).reindex(columns=INSTANCE_COLUMNS)
+    else:
+        instances = pd.DataFrame(columns=INSTANCE_COLUMNS)
+    # Site indexes fit in 32 bits, and the few distinct version strings repeat
+    # across thousands of instances, so store them as categorical codes
+    instances['site_index'] = instances['site_index'].astype('int32')
+    instances['version'] = instances['version'].astype('category')
+    # Global names stay strings; keep them Arrow-backed whatever the pandas
+    # default string dtype, so counting them hashes Arrow strings
+    instances['globalVarName'] = instances['globalVarName'].astype('string[pyarrow]')
+
+    # Bucket versions once
+    instances['version_bucket'] = bucket_versions(instances['version'])
+
+    top_level = pd.DataFrame(top_level_rows, columns=TOP_LEVEL_COLUMNS).astype({
+        'site_index': 'int32',
+        'version': 'category',
+        'globalVarName': 'string[pyarrow]'
+    })
+    top_level['version_bucket'] = bucket_versions(top_level['version'])
+    return total_sites, instances, libraries, top_level
+
+# Function to extract and classify modules (cached like `normalize_data`)
+@st.cache_resource(max_entries=4)
+def extract_module_stats(data_key, _instances):
+    # One row per unique module within each Prebid instance; the module lists are
+    # first converted to an Arrow list column, so the explode and the counts
+    # below run on Arrow strings instead of Python objects. The column is all
+    # NaN floats when no instance lists modules, so go through object first.
+    module_rows = (
+        _instances[['site_index', 'modules']]
+        .astype({'modules': object})
+        .astype({'modules': MODULE_LIST_DTYPE})
+        .explode('modules')
+        .dropna(subset=['modules'])
+        .rename_axis('instance')
+        .reset_index()
+        .drop_duplicates(['instance', 'modules'])
+    )
+
+    module_stats = pd.DataFrame({
+        'Number of Sites': module_rows.drop_duplicates(['site_index', 'modules'])['modules'].value_counts(sort=False),
+        'Number of Instances': module_rows['modules'].value_counts(sort=False)
+    })
+    # Module names back to pandas' own string dtype, which `str.extract` with
+    # lookaheads supports
+    module_stats.index = module_stats.index.astype('str')
+
+    # No instance lists any module: every category table is empty
+    if module_stats.empty:
+        module_stats['category'] = pd.Series(dtype='str')
+        return module_stats
+
+    module_stats['category'] = classify_modules(module_stats.index.to_series())
+    return module_stats
+
+# Function to count occurrences of each version bucket; categorical counts come
+# back in bucket order, and only buckets that occur are kept
+@st.cache_resource(max_entries=4)
+def count_versions(data_key, _instances, _top_level):
+    version_counts = (
+        _instances['version_bucket'].value_counts(sort=False)
+        + _top_level['version_bucket'].value_counts(sort=False)
+    )
+    return version_counts[version_counts > 0]
+
+# Buckets of the Prebid instances per site chart
+PREBID_INSTANCE_LABELS = ['0', '1', '2', '3', '4', '5', '6+']
+
+# Function to count Prebid instances per site, bucketed as 0-5 and 6+
+@st.cache_resource(max_entries=4)
+def count_prebid_instances(data_key, _instances, total_sites):
+    # Instances per site; sites without any Prebid instance have no rows and count as zero
+    prebid_instance_counts = np.bincount(_instances['site_index'], minlength=total_sites)
+    return np.bincount(np.minimum(prebid_instance_counts, 6), minlength=len(PREBID_INSTANCE_LABELS))
+
+# Function to count occurrences of each library, most common first
+@st.cache_resource(max_entries=4)
+def count_libraries(data_key, _libraries):
+    return pd.Series(dict(_libraries.most_common()), dtype='int64')
+
+# Function to count occurrences of each global variable name, most common first
+@st.cache_resource(max_entries=4)
+def count_global_var_names(data_key, _instances, _top_level):
+    # In site order, so names with equal counts keep their order of appearance
+    global_var_names = pd.concat([
+        _instances[['site_index', 'globalVarName']],
+        _top_level[['site_index', 'globalVarName']]
+    ]).sort_values('site_index', kind='stable')['globalVarName']
+    return global_var_names.dropna().value_counts()
+
+# Translation table escaping special characters in chart labels, built once:
+# each special character gets an escaped backslash in front of it, and a
+# backslash is doubled, the same result as replacing them one after another
+LABEL_ESCAPES = str.maketrans({char: '\\\\' + char for char in '_$%&#{}~^'} | {'\\': '\\\\'})
+
+# Function to escape special characters in a chart label
+def escape_label(label):
+    return label.translate(LABEL_ESCAPES)
 
 # Create a bar chart of the version buckets
-def create_version_chart(data):
-    # Extract and categorize versions
-    version_buckets = []
-    for item in data:
-        versions = extract_versions(item)
-        for version in versions:
-            version_bucket = categorize_version(version)
-            version_buckets.append(version_bucket)
-
-    # Create a DataFrame and count occurrences of each version bucket
-    version_counts = pd.Series(version_buckets).value_counts().sort_index()
-
+def create_version_chart(version_counts, total_sites):
     # Plot the bar chart
     fig, ax = plt.subplots()
-    ax.bar(version_counts.index, version_counts.values)
+    ax.bar(version_counts.index.astype(str), version_counts.values)
     ax.set_xlabel('Version Buckets')
     ax.set_ylabel('Number of URLs')
     ax.set_title('Number of URLs by Prebid.js Version')
     plt.xticks(rotation=45, ha='right')
     st.pyplot(fig)
+    plt.close(fig)
 
     # Display the total number of sites
-    st.write(f"Total Number of Sites: {len(data)}")
+    st.write(f"Total Number of Sites: {total_sites}")
 
 # Create a bar chart of Prebid instances per site
-def create_prebid_instance_chart(data):
-    prebid_instance_counts = [count_prebid_instances(item) for item in data]
-
-    # Adjust labels and bins to include zero instances
-    labels = ['0', '1', '2', '3', '4', '5', '6+']
-    bins = [-0.1, 0,1,2,3,4,5,float('inf')]  # Start from -0.1 to include zero counts properly
-
-    binned_counts = pd.cut(prebid_instance_counts, bins=bins, right=True, labels=labels)
-    prebid_instance_distribution = binned_counts.value_counts().sort_index()
-
+def create_prebid_instance_chart(prebid_instance_distribution):
     # Plot the bar chart
     fig, ax = plt.subplots()
-    ax.bar(prebid_instance_distribution.index.astype(str), prebid_instance_distribution.values)
+    ax.bar(PREBID_INSTANCE_LABELS, prebid_instance_distribution)
     ax.set_xlabel('Number of Prebid Instances per Site')
     ax.set_ylabel('Number of Sites')
     ax.set_title('Distribution of Prebid Instances per Site')
     plt.xticks(rotation=0)
     st.pyplot(fig)
+    plt.close(fig)
+
+# Number of bars drawn by default in the popularity charts
+DEFAULT_TOP_N = 30
+
+# Function to keep only the most common entries of a popularity chart; the long
+# tail of rare entries makes the chart slow to draw and the labels unreadable,
+# so longer lists get a slider for how many bars to show
+def select_top_n(counts, label):
+    if len(counts) <= DEFAULT_TOP_N:
+        return counts
+    top_n = st.slider(label, min_value=1, max_value=len(counts), value=DEFAULT_TOP_N)
+    return counts.head(top_n)
 
 # Create a bar chart of library popularity
-def create_library_chart(data):
-    all_libraries = []
-    for item in data:
-        libraries = extract_libraries(item)
-        all_libraries.extend(libraries)
-
-    if all_libraries:
-        library_counts = pd.Series(all_libraries).value_counts().sort_values(ascending=False)
-
-        # Escape special characters in labels
-        def escape_label(label):
-            special_chars = ['_', '$', '%', '&', '#', '{', '}', '~', '^', '\\']
-            for char in special_chars:
-                label = label.replace(char, f'\\{char}')
-            return label
+def create_library_chart(library_counts):
+    if not library_counts.empty:
+        library_counts = select_top_n(library_counts, 'Number of libraries to show')
 
         escaped_labels = [escape_label(name) for name in library_counts.index]
 
@@ -259,7 +471,6 @@ def create_library_chart(data):
         ax.set_xticklabels(escaped_labels, rotation=45, ha='right')
 
         # Use FixedFormatter to prevent automatic formatting
-        import matplotlib.ticker as ticker
         ax.xaxis.set_major_formatter(ticker.FixedFormatter(escaped_labels))
 
         # Ensure labels are treated as plain text
@@ -267,24 +478,14 @@ def create_library_chart(data):
             label.set_text(label.get_text())
 
         st.pyplot(fig)
+        plt.close(fig)
     else:
         st.write("No libraries data available to plot.")
 
 # Create a bar chart of Prebid global object name popularity
-def create_global_var_name_chart(data):
-    import matplotlib.ticker as ticker
-
-    global_var_names = extract_global_var_names(data)
-    if global_var_names:
-        # Count occurrences of each global variable name
-        global_var_name_counts = pd.Series(global_var_names).value_counts().sort_values(ascending=False)
-
-        # Escape special characters in labels
-        def escape_label(label):
-            special_chars = ['_', '$', '%', '&', '#', '{', '}', '~', '^', '\\']
-            for char in special_chars:
-                label = label.replace(char, f'\\{char}')
-            return label
+def create_global_var_name_chart(global_var_name_counts):
+    if not global_var_name_counts.empty:
+        global_var_name_counts = select_top_n(global_var_name_counts, 'Number of global object names to show')
 
         escaped_labels = [escape_label(name) for name in global_var_name_counts.index]
 
@@ -307,24 +508,30 @@ def create_global_var_name_chart(data):
             label.set_text(label.get_text())
 
         st.pyplot(fig)
+        plt.close(fig)
     else:
         st.write("No Prebid global variable names found to plot.")
 
-# Function to display module statistics
-def display_module_stats(module_site_stats, module_instance_stats, sites_with_prebid, total_prebid_instances):
-    for category in module_site_stats.keys():
-        site_counter = module_site_stats[category]
-        instance_counter = module_instance_stats[category]
+# Function to build the popularity table of a single module category; cached
+# per (data_key, category) so a table is only built the first time it is shown
+@st.cache_resource(max_entries=4 * len(MODULE_CATEGORIES))
+def build_module_table(data_key, _module_stats, category):
+    category_stats = _module_stats[_module_stats['category'] == category]
 
-        # Create a DataFrame with columns: Module Name, Number of Sites, Number of Instances
-        df = pd.DataFrame({
-            category: list(site_counter.keys()),
-            'Number of Sites': list(site_counter.values()),
-            'Number of Instances': [instance_counter[module] for module in site_counter.keys()]
-        })
+    # Create a DataFrame with columns: Module Name, Number of Sites, Number of Instances
+    df = pd.DataFrame({
+        category: category_stats.index,
+        'Number of Sites': category_stats['Number of Sites'].values,
+        'Number of Instances': category_stats['Number of Instances'].values
+    })
 
-        # Sort the DataFrame by Number of Sites
-        df = df.sort_values(by='Number of Sites', ascending=False).reset_index(drop=True)
+    # Sort the DataFrame by Number of Sites
+    return df.sort_values(by='Number of Sites', ascending=False).reset_index(drop=True)
+
+# Function to display module statistics
+def display_module_stats(data_key, module_stats, sites_with_prebid, total_prebid_instances):
+    for category in MODULE_CATEGORIES:
+        df = build_module_table(data_key, module_stats, category)
 
         # Display total number of sites with Prebid.js and instances for reference
         st.subheader(f"{category} Popularity (Total Sites with Prebid.js: {sites_with_prebid}, Total Prebid Instances: {total_prebid_instances})")
@@ -338,23 +545,8 @@ st.subheader('We are continually updating this app and adding websites to review
 # Default JSON data URL
 default_json_url = 'https://raw.githubusercontent.com/prebid/prebid-integration-monitor/main/output/results.json'
 
-# Load default JSON data from URL
-@st.cache_data
-def load_default_json(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        st.error(f"Error fetching data from URL: {e}")
-        return None
-    except json.JSONDecodeError:
-        st.error("The data fetched is not a valid JSON.")
-        return None
-    return data
-
 # Load default data
-data = load_default_json(default_json_url)
+data, data_key = load_json_from_url(default_json_url)
 if data is None:
     st.stop()
 
@@ -363,7 +555,8 @@ uploaded_file = st.file_uploader('Upload a JSON file (optional)', type='json')
 
 if uploaded_file is not None:
     # If user uploaded a file, use that data
-    data = load_json(uploaded_file)
+    data = load_json(uploaded_file.file_id, uploaded_file)
+    data_key = uploaded_file.file_id
     if data is None:
         st.stop()
     else:
@@ -373,18 +566,36 @@ else:
 
 # Proceed with the rest of the code using `data`
 if data:
-    # Filter out entries with more than 300 modules
-    filtered_data = [item for item in data if count_modules(item) <= 300]
-
-    # Calculate total sites with Prebid.js
-    sites_with_prebid = sum(1 for item in filtered_data if count_prebid_instances(item) > 0)
-
-    create_version_chart(filtered_data)
-    create_prebid_instance_chart(filtered_data)
-    create_library_chart(filtered_data)
-    create_global_var_name_chart(filtered_data)
-
-    module_site_stats, module_instance_stats, total_prebid_instances = extract_module_stats(filtered_data)
-    display_module_stats(module_site_stats, module_instance_stats, sites_with_prebid, total_prebid_instances)
+    # Filter and normalize once into one row per Prebid instance
+    total_sites, instances, libraries, top_level = normalize_data(data_key, data)
+
+    # Calculate total sites with Prebid.js and total Prebid instances
+    sites_with_prebid = instances['site_index'].nunique()
+    total_prebid_instances = len(instances)
+
+    # Tabs track the selected view, so only the open tab builds and renders
+    # its chart or tables; hidden tabs cost nothing until they are selected
+    version_tab, instance_tab, library_tab, global_var_name_tab, module_tab = st.tabs(
+        ['Versions', 'Prebid Instances', 'Libraries', 'Global Object Names', 'Modules'],
+        key='view',
+        on_change='rerun'
+    )
+
+    if version_tab.open:
+        with version_tab:
+            create_version_chart(count_versions(data_key, instances, top_level), total_sites)
+    if instance_tab.open:
+        with instance_tab:
+            create_prebid_instance_chart(count_prebid_instances(data_key, instances, total_sites))
+    if library_tab.open:
+        with library_tab:
+            create_library_chart(count_libraries(data_key, libraries))
+    if global_var_name_tab.open:
+        with global_var_name_tab:
+            create_global_var_name_chart(count_global_var_names(data_key, instances, top_level))
+    if module_tab.open:
+        with module_tab:
+            module_stats = extract_module_stats(data_key, instances)
+            display_module_stats(data_key, module_stats, sites_with_prebid, total_prebid_instances)
 else:
     st.write("No valid data available for processing.")